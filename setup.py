@@ -125,6 +125,7 @@ setup(
     maintainer_email=EMAIL,
     url=URL,
     install_requires=INSTALL_REQUIRES,
+    python_requires='>=3.7',
     packages=find_packages('.'),
     package_data={
         'woudc_extcsv': ['tables-schema.json', 'tables-backfilling.yml',
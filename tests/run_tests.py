@@ -296,6 +296,39 @@ class ParserTest(unittest.TestCase):
         ecsv.validate_metadata_tables()
         self.assertTrue(set(DOMAINS['Common']).issubset(set(ecsv.extcsv)))
 
+    def test_byte_order_mark(self):
+        """Test that a leading byte order mark is ignored while parsing"""
+
+        contents = load_test_data_file(
+                'data/general/ecsv-no-spaced.csv')._raw
+        ecsv = ExtendedCSV('\ufeff' + contents)
+        ecsv.validate_metadata_tables()
+        self.assertTrue(set(DOMAINS['Common']).issubset(set(ecsv.extcsv)))
+
+    def test_bad_separator_quoted_newline(self):
+        """Test fixing bad separators in a cell with a quoted line break"""
+
+        ecsv = ExtendedCSV('#CONTENT\nClass,Category,Level,Form\n'
+                           '"WOUDC;x\ny",TotalOzone,1.0,1\n')
+
+        self.assertEqual(ecsv.extcsv['CONTENT']['Class'], ['WOUDC'])
+        self.assertEqual(ecsv.extcsv['CONTENT']['Category'], ['x'])
+        self.assertEqual(len(ecsv.warnings), 1)
+
+    def test_keep_raw(self):
+        """Test that the source text can be discarded after parsing"""
+
+        contents = load_test_data_file(
+                'data/general/ecsv-no-spaced.csv')._raw
+
+        ecsv = ExtendedCSV(contents)
+        self.assertEqual(ecsv._raw, contents)
+
+        ecsv = ExtendedCSV(contents, keep_raw=False)
+        self.assertIsNone(ecsv._raw)
+        ecsv.validate_metadata_tables()
+        self.assertTrue(set(DOMAINS['Common']).issubset(set(ecsv.extcsv)))
+
 
 class TimestampParsingTest(unittest.TestCase):
     """Test suite for parser.ExtendedCSV._parse_timestamp"""
@@ -444,6 +477,8 @@ class DatestampParsingTest(unittest.TestCase):
             self._parse_datestamp('2014-06-00')
         with self.assertRaises(ValueError):
             self._parse_datestamp('1971-02-30')
+        self.assertIn('#Dummy.Date day is not within allowable range'
+                      ' [01]-[28]', self.parser.errors)
 
         with self.assertRaises(ValueError):
             self._parse_datestamp('1996-31-12')
@@ -1089,6 +1124,21 @@ class ExtendedCSVTest(unittest.TestCase):
         ecsv.validate_metadata_tables()
         self.assertEqual(ecsv.number_of_observations(), 15)
 
+    def test_number_of_observations_renamed_field(self):
+        """
+        Test counting of observation rows after editing a data table directly
+        """
+
+        ecsv = load_test_data_file(
+                'data/totalozone/20111101.Brewer.MKIII.201.RMDA.csv',
+                reader=False)
+        ecsv.validate_metadata_tables()
+        ecsv.validate_dataset_tables()
+        self.assertEqual(ecsv.number_of_observations(), 30)
+
+        ecsv.extcsv['DAILY']['DATEX'] = ecsv.extcsv['DAILY'].pop('Date')
+        self.assertEqual(ecsv.number_of_observations(), 30)
+
     def test_row_filling(self):
         """Test that omitted columns in a row are filled in with nulls"""
 
@@ -1241,6 +1291,12 @@ class ExtendedCSVTest(unittest.TestCase):
             self.assertEqual(ecsv.extcsv['CONTENT'][field], [value])
             self.assertEqual(ecsv.extcsv['CONTENT_2'][field], [value])
 
+        ecsv.add_values_to_table('CONTENT', values, 45, index=2)
+
+        for field, value in zip(fields, values):
+            self.assertEqual(ecsv.extcsv['CONTENT'][field], [value])
+            self.assertEqual(ecsv.extcsv['CONTENT_2'][field], [value, value])
+
         ecsv.remove_table('CONTENT', index=2)
         self.assertIn('CONTENT', ecsv.extcsv)
         self.assertEqual(ecsv.table_count('CONTENT'), 1)
@@ -2090,6 +2146,45 @@ class WriterTest(unittest.TestCase):
                          get_data(extcsv, 'CONTENT', 'Class'),
                          'expected specific value')
 
+    def test_add_value_bulk(self):
+        """Test adding already-split values to a field in bulk"""
+
+        extcsv = Writer()
+        extcsv.add_data('GLOBAL', '290.0', field='Wavelength')
+        extcsv.add_data_bulk('GLOBAL', 'Wavelength', [290.5, '291.0'])
+        extcsv.add_data_bulk('GLOBAL', 'S-Irradiance', ['1.700E-06'],
+                             index=2)
+        self.assertEqual(['290.0', '290.5', '291.0'],
+                         get_data(extcsv, 'GLOBAL', 'Wavelength'),
+                         'expected specific value')
+        self.assertEqual(['1.700E-06'],
+                         get_data(extcsv, 'GLOBAL', 'S-Irradiance', index=2),
+                         'expected specific value')
+
+    def test_serialize_table_names(self):
+        """Test serializing tables whose names contain digits"""
+
+        extcsv = Writer()
+        extcsv.add_data('N14_VALUES', '1,2', field='WLCode,ObsCode')
+        extcsv.add_data('N14_VALUES', '3,4', field='WLCode,ObsCode', index=2)
+        extcsv.add_data('SAOZ_DATA_V2', '5', field='Date')
+
+        serialized = extcsv.serialize().getvalue().splitlines()
+        self.assertEqual(['#N14_VALUES', '#N14_VALUES', '#SAOZ_DATA_V2'],
+                         [line for line in serialized
+                          if line.startswith('#')])
+
+    def test_serialize_empty_table(self):
+        """Test serializing a table without fields"""
+
+        extcsv = Writer()
+        extcsv.add_table('CONTENT')
+        extcsv.add_data('PLATFORM', 'STN', field='Type')
+
+        serialized = extcsv.serialize().getvalue().splitlines()
+        self.assertEqual(['#CONTENT', '', '', '#PLATFORM', 'Type', 'STN'],
+                         serialized)
+
     def test_remove_table(self):
         """Test removing table"""
         # new extcsv object
@@ -2177,6 +2272,19 @@ class WriterTest(unittest.TestCase):
         self.assertFalse('v2' in get_data(extcsv, 'TABLE', 'Field1', index=2),
                          'unexpected value found')
 
+    def test_clear_field(self):
+        """Test clearing all values from a field"""
+        extcsv = Writer()
+        extcsv.add_data('TABLE', 'v1,v2', field='Field1,Field2')
+        extcsv.add_data('TABLE', 'v3,v4', field='Field1,Field2', index=2)
+        extcsv.clear_field('TABLE', 'Field1', index=2)
+        self.assertEqual([], get_data(extcsv, 'TABLE', 'Field1', index=2),
+                         'expected empty field')
+        self.assertEqual(['v4'], get_data(extcsv, 'TABLE', 'Field2', index=2),
+                         'expected specific value')
+        self.assertEqual(['v1'], get_data(extcsv, 'TABLE', 'Field1'),
+                         'expected specific value')
+
 
 # main
 if __name__ == '__main__':
@@ -43,6 +43,7 @@
 #
 # =================================================================
 
+import calendar
 import csv
 import json
 import io
@@ -54,12 +55,17 @@ import jsonschema
 import logging
 
 from io import StringIO
-from datetime import datetime, time
-from collections import OrderedDict
+from datetime import date, datetime, time
+from itertools import chain, islice, repeat
 
 from woudc_extcsv.util import (parse_integer_range, _table_index,
                                non_content_line)
 
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
 
 __version__ = '0.5.0'
 
@@ -71,21 +77,63 @@ WDR_ERROR_CONFIG = os.path.join(__dirpath, 'errors-backfilling.csv')
 
 LOGGER = logging.getLogger(__name__)
 
+_TABLE_INDEX_SUFFIX_RE = re.compile(r'_\d+$')
+_LINE_SEPARATOR = os.linesep
+_TABLE_HEADER_TEMPLATE = '#%s' + _LINE_SEPARATOR
+_COMMENT_TEMPLATE = '* %s' + _LINE_SEPARATOR
+
+_BAD_SEPARATORS = ('::', ';', '$', '%', '|', '\\')
+_BAD_SEPARATOR_RE = re.compile(r'::|[;$%|\\]')
+_DATETIME_SEPARATOR_RE = re.compile(r'[^\w\d]')
+_INTEGER_RE = re.compile(r'-?\d+')
+_FLOAT_RE = re.compile(r'-?(?:\d+\.\d*|\.\d+)')
+_UTCOFFSET_SEPARATOR_RE = re.compile(r'[^-\+\w\d]')
+
+_UTCOFFSET_SIGN = r'(\+|-|\+-)?'
+_UTCOFFSET_DELIM = r'[^-\+\w\d]'
+_UTCOFFSET_MANDATORY_PLACE = r'([\d]{1,2})'
+_UTCOFFSET_OPTIONAL_PLACE = '(' + _UTCOFFSET_DELIM + r'([\d]{0,2}))?'
+_UTCOFFSET_RE = re.compile('^{sign}{mandatory}{optional}{optional}$'
+                           .format(sign=_UTCOFFSET_SIGN,
+                                   mandatory=_UTCOFFSET_MANDATORY_PLACE,
+                                   optional=_UTCOFFSET_OPTIONAL_PLACE))
+_UTCOFFSET_ZERO_RE = re.compile('^{sign}[0]+{delim}?[0]*{delim}?[0]*$'
+                                .format(sign=_UTCOFFSET_SIGN,
+                                        delim=_UTCOFFSET_DELIM))
+
+# names of the ExtendedCSV methods parsing special columns, by field name
+_FIELD_PARSERS = {
+    'time': 'parse_timestamp',
+    'date': 'parse_datestamp',
+    'utcoffset': 'parse_utcoffset'
+}
+
+# CONTENT fields identifying a dataset's table definitions, in lookup order
+_DATASET_KEY_FIELDS = (
+    ('Category', str, '#CONTENT.Category'),
+    ('Level', float, '#CONTENT.Level'),
+    ('Form', int, '#CONTENT.Form')
+)
+
 with open(WDR_TABLE_SCHEMA) as table_schema_file:
     table_schema = json.load(table_schema_file)
 with open(WDR_TABLE_CONFIG) as table_definitions:
-    DOMAINS = yaml.safe_load(table_definitions)
+    DOMAINS = yaml.load(table_definitions, Loader=_YamlLoader)
 with open(WDR_ERROR_CONFIG) as error_definitions:
     reader = csv.reader(error_definitions, escapechar='\\')
     next(reader)  # Skip header line.
-    ERRORS = OrderedDict()
+    ERRORS = {}
     for row in reader:
         error_code = int(row[0])
-        ERRORS[error_code] = row[1:3]
+        severity, template = (column.strip() for column in row[1:3])
+        ERRORS[error_code] = (severity == 'Error', template)
 
 
 try:
-    jsonschema.validate(DOMAINS, table_schema)
+    _schema_validator_cls = jsonschema.validators.validator_for(table_schema)
+    _schema_validator_cls.check_schema(table_schema)
+    _DOMAINS_VALIDATOR = _schema_validator_cls(table_schema)
+    _DOMAINS_VALIDATOR.validate(DOMAINS)
 except jsonschema.SchemaError as err:
     LOGGER.critical('Failed to read table definition schema:'
                     ' cannot process incoming files')
@@ -96,6 +144,65 @@ except jsonschema.ValidationError as err:
     raise err
 
 
+def _build_field_case_maps(definition):
+    """
+    Returns mappings of lowercased field names to their expected
+    capitalization for the required and optional fields of the table
+    definition <definition>.
+
+    :param definition: schema definition of a table.
+    :returns: pair of `dict`s for required and optional fields.
+    """
+
+    required = definition.get('required_fields', ())
+    optional = definition.get('optional_fields', ())
+
+    return ({key.lower(): key for key in required},
+            {key.lower(): key for key in optional})
+
+
+def _collect_field_case_maps(node, case_maps):
+    """
+    Adds the field case mappings of every table definition found within
+    <node>, a section of the table definitions file, to <case_maps>.
+
+    :param node: section of the table definitions.
+    :param case_maps: `dict` of definition ids to definitions and mappings.
+    :returns: void
+    """
+
+    if not isinstance(node, dict):
+        return
+
+    if 'required_fields' in node:
+        case_maps[id(node)] = (node, _build_field_case_maps(node))
+    else:
+        for child in node.values():
+            _collect_field_case_maps(child, case_maps)
+
+
+_FIELD_CASE_MAPS = {}
+_collect_field_case_maps(DOMAINS, _FIELD_CASE_MAPS)
+
+
+def _field_case_maps(definition):
+    """
+    Returns mappings of lowercased field names to their expected
+    capitalization for the required and optional fields of the table
+    definition <definition>. Mappings for the table definitions in
+    DOMAINS are built once at import; others are built on each call.
+
+    :param definition: schema definition of a table.
+    :returns: pair of `dict`s for required and optional fields.
+    """
+
+    cached = _FIELD_CASE_MAPS.get(id(definition), None)
+    if cached is not None and cached[0] is definition:
+        return cached[1]
+
+    return _build_field_case_maps(definition)
+
+
 def dump(extcsv_obj, filename):
     """
     Dump Reader Extended CSV object to file
@@ -157,24 +264,25 @@ def load(filename, reader=True):
     :returns: Extended CSV data structure
     """
 
+    with io.open(filename, 'rb') as ff:
+        raw = ff.read()
+
     try:
-        with io.open(filename, encoding='utf-8') as ff:
-            content = ff.read()
-            if not reader:
-                return ExtendedCSV(content)
-            else:
-                return Reader(content)
+        content = raw.decode('utf-8')
     except UnicodeError as err:
         LOGGER.warning(err)
         msg = 'Unable to read {} with utf8 encoding. Attempting to read' \
               ' with latin1 encoding.'.format(filename)
         LOGGER.info(msg)
-        with io.open(filename, encoding='latin1') as ff:
-            content = ff.read()
-            if not reader:
-                return ExtendedCSV(content)
-            else:
-                return Reader(content)
+        content = raw.decode('latin1')
+
+    # Translate line endings as reading in text mode would
+    content = content.replace('\r\n', '\n').replace('\r', '\n')
+
+    if not reader:
+        return ExtendedCSV(content)
+    else:
+        return Reader(content)
 
 
 def loads(strbuf):
@@ -188,6 +296,65 @@ def loads(strbuf):
     return Reader(strbuf)
 
 
+def _split_row(text, delimiter=','):
+    """
+    Split the first line of <text> into its <delimiter>-separated values,
+    following CSV quoting rules.
+
+    :param text: string of delimited values.
+    :param delimiter: delimiter between values.
+    :returns: list of values.
+    """
+
+    if '"' not in text and '\n' not in text and '\r' not in text:
+        return text.split(delimiter)
+
+    return next(csv.reader(StringIO(text), delimiter=delimiter))
+
+
+def _typecast_number(value, line_num=None):
+    """
+    Returns the string <value> converted to an int or float if it
+    represents a number, None if it is empty, or the original string
+    otherwise. Numbers with leading zeroes are kept as strings.
+
+    :param value: string containing a value
+    :param line_num: unused, accepted for use as a column caster
+    :returns: value cast to a number if possible
+    """
+
+    if value == '':  # Empty CSV cell
+        return None
+
+    # Plain decimal numbers are recognized without exception handling
+    if _INTEGER_RE.fullmatch(value) is not None:
+        if len(value) > 1 and value.startswith('0'):
+            return value
+        return int(value)
+    elif _FLOAT_RE.fullmatch(value) is not None:
+        return float(value)
+
+    try:
+        if '.' in value:  # Check float conversion
+            return float(value)
+        elif len(value) > 1 and value.startswith('0'):
+            return value
+        else:  # Check integer conversion
+            return int(value)
+    except Exception:  # Default type to string
+        return value
+
+
+class _MessageParameters(dict):
+    """
+    Keyword arguments for an error message template, leaving any
+    placeholder without a matching argument in place
+    """
+
+    def __missing__(self, key):
+        return '{' + key + '}'
+
+
 class ExtendedCSV(object):
     """
 
@@ -197,11 +364,13 @@ class ExtendedCSV(object):
 
     """
 
-    def __init__(self, content, reporter=None):
+    def __init__(self, content, reporter=None, keep_raw=True):
         """
         Read WOUDC Extended CSV file
 
         :param content: buffer of Extended CSV data
+        :param keep_raw: whether to keep a copy of the source text
+                         after parsing
         :returns: `ExtendedCSV` object
         """
 
@@ -210,6 +379,7 @@ class ExtendedCSV(object):
 
         self._table_count = {}
         self._line_num = {}
+        self._table_types = {}
 
         self.file_comments = []
         self.warnings = []
@@ -218,37 +388,51 @@ class ExtendedCSV(object):
 
         self._noncore_table_schema = None
         self._observations_table = None
+        self._present_year = datetime.now().year
 
         LOGGER.debug('Reading into csv')
-        self._raw = content
-        reader = csv.reader(StringIO(self._raw))
+        raw = content.lstrip('\ufeff')
+        if keep_raw:
+            self._raw = raw
+        reader = csv.reader(StringIO(raw))
 
         LOGGER.debug('Parsing object model')
         parent_table = None
         lines = enumerate(reader, 1)
+        non_content = non_content_line  # local alias for the parse loop
 
         success = True
         for line_num, row in lines:
-            separators = []
-            for bad_sep in ['::', ';', '$', '%', '|', '\\']:
-                if not non_content_line(row) and bad_sep in row[0]:
-                    separators.append(bad_sep)
+            # blank lines and comments need no further dispatch
+            if non_content(row):
+                if len(row) > 0 and row[0].startswith('*'):  # comment
+                    LOGGER.debug('Found comment')
+                    self.file_comments.append(row)
+                else:  # blank line
+                    LOGGER.debug('Found blank line')
+                continue
 
-            for separator in separators:
-                comma_separated = row[0].replace(separator, ',')
-                row = next(csv.reader(StringIO(comma_separated)))
+            if _BAD_SEPARATOR_RE.search(row[0]) is not None:
+                first = row[0]
+                separators = [bad_sep for bad_sep in _BAD_SEPARATORS
+                              if bad_sep in first]
 
-                if not self._add_to_report(104, line_num, separator=separator):
-                    success = False
+                for separator in separators:
+                    comma_separated = row[0].replace(separator, ',')
+                    row = next(csv.reader(StringIO(comma_separated)))
+
+                    if not self._add_to_report(104, line_num,
+                                               separator=separator):
+                        success = False
 
             if len(row) == 1 and row[0].startswith('#'):  # table name
-                parent_table = ''.join(row).lstrip('#').strip()
+                parent_table = row[0].lstrip('#').strip()
 
                 try:
                     LOGGER.debug('Found new table {}'.format(parent_table))
                     ln, fields = next(lines)
 
-                    while non_content_line(fields):
+                    while non_content(fields):
                         if not self._add_to_report(103, ln):
                             success = False
                         ln, fields = next(lines)
@@ -259,14 +443,7 @@ class ExtendedCSV(object):
                     if not self._add_to_report(206, line_num,
                                                table=parent_table):
                         success = False
-            elif len(row) > 0 and row[0].startswith('*'):  # comment
-                LOGGER.debug('Found comment')
-                self.file_comments.append(row)
-                continue
-            elif non_content_line(row):  # blank line
-                LOGGER.debug('Found blank line')
-                continue
-            elif parent_table is not None and not non_content_line(row):
+            elif parent_table is not None:
                 if not self.add_values_to_table(parent_table, row, line_num):
                     success = False
             else:
@@ -290,18 +467,8 @@ class ExtendedCSV(object):
             message, severe = self.reports.add_message(error_code, line,
                                                        **kwargs)
         else:
-            severe = ERRORS[error_code][0] == 'Error'
-            message = ERRORS[error_code][1]
-            while '{' in message:
-                for i in range(0, len(message), 1):
-                    if message[i] == '{':
-                        key_start = i+1
-                    elif message[i] == '}':
-                        curr_key = message[key_start:i]
-                        message = message[0:key_start-1] + \
-                            str(kwargs[curr_key]) + \
-                            message[i+1:len(message)]
-                        break
+            severe, template = ERRORS[error_code]
+            message = template.format_map(_MessageParameters(kwargs))
 
         if severe:
             LOGGER.error(message)
@@ -312,6 +479,24 @@ class ExtendedCSV(object):
 
         return not severe
 
+    def _add_to_report_many(self, reports):
+        """
+        Submit a series of warnings or errors to the report generator,
+        in order. Each item of <reports> is a tuple of the error code,
+        the line it was found at and a dict of keyword arguments detailing
+        the message, as taken by `_add_to_report`.
+
+        :returns: False iff any of the errors is serious enough to
+        abort parsing, i.e. True iff the file can continue parsing.
+        """
+
+        success = True
+        for error_code, line, kwargs in reports:
+            if not self._add_to_report(error_code, line, **kwargs):
+                success = False
+
+        return success
+
     def add_comment(self, comment):
         """
         Add file-level comments
@@ -368,6 +553,33 @@ class ExtendedCSV(object):
 
         return self._table_count.get(table_type, 0)
 
+    def _table_fields(self, table_name):
+        """
+        Returns the names of the columns in the table named <table_name>,
+        excluding its comments.
+
+        :param table_name: name of an Extended CSV table.
+        :returns: tuple of field names in <table_name>.
+        """
+
+        return tuple(self.extcsv[table_name])[1:]
+
+    def _table_type(self, table_name):
+        """
+        Returns the type of the table named <table_name>, i.e. its name
+        without any occurrence index suffix.
+
+        :param table_name: name of an Extended CSV table.
+        :returns: type of <table_name>.
+        """
+
+        table_type = self._table_types.get(table_name, None)
+        if table_type is None:
+            table_type = table_name.rstrip('0123456789_')
+            self._table_types[table_name] = table_type
+
+        return table_type
+
     def init_table(self, table_name, fields, line_num):
         """
         Record an empty Extended CSV table named <table_name> with
@@ -389,7 +601,7 @@ class ExtendedCSV(object):
             self._table_count[table_name] = updated_count
             table_name += '_' + str(updated_count)
 
-        self.extcsv[table_name] = OrderedDict()
+        self.extcsv[table_name] = {}
         self._line_num[table_name] = line_num
 
         self.extcsv[table_name]['comments'] = []
@@ -450,36 +662,36 @@ class ExtendedCSV(object):
         """
         success = True
         _table_name = _table_index(table_name, index)
+        table = self.extcsv[_table_name]
 
         if horizontal:  # horizontal insert
             if fields is not None:
-                all_fields = list(self.extcsv[_table_name].keys())[1:]
-                for f in all_fields:
+                for f in self._table_fields(_table_name):
                     if f not in fields:
                         fields.append(f)
                         values.append('')
             else:
-                fields = list(self.extcsv[_table_name].keys())[1:]
-                fillins = len(fields) - len(values)
+                fields = self._table_fields(_table_name)
 
-                if fillins < 0:
+                if len(values) > len(fields):
                     if not self._add_to_report(
                             212, line_num, table=_table_name):
                         success = False
 
-                values.extend([''] * fillins)
-                values = values[:len(fields)]
+                # pad short rows with empty values, excess ones are dropped
+                values = chain(values, repeat(''))
 
             for field, value in zip(fields, values):
-                self.extcsv[table_name][field].append(value.strip())
+                table[field].append(value.strip())
 
         else:  # vertical insert
             if len(fields) == 1:
+                column = table[fields[0]]
                 for value in values:
-                    self.extcsv[table_name][fields[0]].append(value)
+                    column.append(value)
             else:
                 for (field, value) in zip(fields, values):
-                    self.extcsv[table_name][field].append(value)
+                    table[field].append(value)
 
         return success
 
@@ -539,7 +751,7 @@ class ExtendedCSV(object):
         """
 
         table_n = _table_index(table, index)
-        if all([d_index is None, data is not None]):  # remove first occurence
+        if d_index is None and data is not None:  # remove first occurence
             try:
                 self.extcsv[table_n][field].remove(data)
                 msg = 'data %s field %s table %s index %s removed' % \
@@ -558,10 +770,10 @@ class ExtendedCSV(object):
                 msg = 'no data found pos %s field %s table %s index %s' % \
                       (d_index, field, table, index)
                 LOGGER.error(msg)
-        if all([data is not None, all_occurences]):  # remove all
+        if data is not None and all_occurences:  # remove all
             LOGGER.info('removing all occurences')
-            val = filter(lambda a: a != data, self.extcsv[table_n][field])
-            self.extcsv[table_n][field] = list(val)
+            column = self.extcsv[table_n][field]
+            self.extcsv[table_n][field] = [a for a in column if a != data]
             msg = 'data %s field %s table %s index %s removed' % \
                   (data, field, table, index)
             LOGGER.info(msg)
@@ -630,32 +842,57 @@ class ExtendedCSV(object):
         :returns: value cast to the appropriate type for its column
         """
 
-        if value == '':  # Empty CSV cell
-            return None
+        return self._resolve_caster(table, field)(value, line_num)
 
-        lowered_field = field.lower()
+    def _resolve_caster(self, table, field):
+        """
+        Returns a function converting string values of the column named
+        <field> in table <table> to their expected type, as done by
+        `typecast_value`. The function takes a value and the line number
+        where it was found.
 
-        try:
-            if lowered_field == 'time':
-                return self.parse_timestamp(table, value, line_num)
-            elif lowered_field == 'date':
-                return self.parse_datestamp(table, value, line_num)
-            elif lowered_field == 'utcoffset':
-                return self.parse_utcoffset(table, value, line_num)
-        except Exception as err:
-            self._add_to_report(335, line_num, table=table, field=field,
-                                reason=err)
-            return value
+        :param table: name of the table where the column was found
+        :param field: name of the column
+        :returns: function converting values of the column
+        """
 
-        try:
-            if '.' in value:  # Check float conversion
-                return float(value)
-            elif len(value) > 1 and value.startswith('0'):
+        parser_name = _FIELD_PARSERS.get(field.lower())
+        if parser_name is None:
+            return _typecast_number
+        parser = getattr(self, parser_name)
+
+        def typecast(value, line_num):
+            if value == '':  # Empty CSV cell
+                return None
+
+            try:
+                return parser(table, value, line_num)
+            except Exception as err:
+                self._add_to_report(335, line_num, table=table, field=field,
+                                    reason=err)
                 return value
-            else:  # Check integer conversion
-                return int(value)
-        except Exception:  # Default type to string
-            return value
+
+        return typecast
+
+    def _int_or_report(self, error_code, table, component, value, line_num):
+        """
+        Convert the string <value> of a date or time <component> to an int,
+        reporting error <error_code> if it is not a valid integer.
+
+        :param error_code: code of the error to report on failure.
+        :param table: name of table the value was found under.
+        :param component: name of the date or time component being parsed.
+        :param value: string value of the component.
+        :param line_num: line number where the value was found.
+        :returns: tuple of the converted value (or None on failure) and
+                  False iff the error is serious enough to abort parsing.
+        """
+
+        try:
+            return int(value), True
+        except ValueError:
+            return None, self._add_to_report(error_code, line_num,
+                                             table=table, component=component)
 
     def parse_timestamp(self, table, timestamp, line_num):
         """
@@ -682,7 +919,7 @@ class ExtendedCSV(object):
         else:
             noon_indicator = None
 
-        separators = re.findall(r'[^\w\d]', timestamp)
+        separators = _DATETIME_SEPARATOR_RE.findall(timestamp)
         bad_seps = set(separators) - set(':')
 
         for separator in bad_seps:
@@ -697,26 +934,15 @@ class ExtendedCSV(object):
         minute = tokens[1] or '00' if len(tokens) > 1 else '00'
         second = tokens[2] or '00' if len(tokens) > 2 else '00'
 
-        hour_numeric = minute_numeric = second_numeric = None
-
-        try:
-            hour_numeric = int(hour)
-        except ValueError:
-            if not self._add_to_report(301, line_num, table=table,
-                                       component='hour'):
-                success = False
-        try:
-            minute_numeric = int(minute)
-        except ValueError:
-            if not self._add_to_report(301, line_num, table=table,
-                                       component='minute'):
-                success = False
-        try:
-            second_numeric = int(second)
-        except ValueError:
-            if not self._add_to_report(301, line_num, table=table,
-                                       component='second'):
-                success = False
+        hour_numeric, valid = self._int_or_report(
+            301, table, 'hour', hour, line_num)
+        success = success and valid
+        minute_numeric, valid = self._int_or_report(
+            301, table, 'minute', minute, line_num)
+        success = success and valid
+        second_numeric, valid = self._int_or_report(
+            301, table, 'second', second, line_num)
+        success = success and valid
 
         if not success:
             raise ValueError('Parsing errors encountered in #{}.Time'
@@ -731,7 +957,7 @@ class ExtendedCSV(object):
                 success = False
             hour_numeric += 12
 
-        if second_numeric is not None and second_numeric not in range(0, 60):
+        if second_numeric is not None and not 0 <= second_numeric < 60:
             if not self._add_to_report(340, line_num, table=table,
                                        component='second',
                                        lower='00', upper='59'):
@@ -740,7 +966,7 @@ class ExtendedCSV(object):
             while second_numeric >= 60 and minute_numeric is not None:
                 second_numeric -= 60
                 minute_numeric += 1
-        if minute_numeric is not None and minute_numeric not in range(0, 60):
+        if minute_numeric is not None and not 0 <= minute_numeric < 60:
             if not self._add_to_report(340, line_num, table=table,
                                        component='minute',
                                        lower='00', upper='59'):
@@ -749,7 +975,7 @@ class ExtendedCSV(object):
             while minute_numeric >= 60 and hour_numeric is not None:
                 minute_numeric -= 60
                 hour_numeric += 1
-        if hour_numeric is not None and hour_numeric not in range(0, 24):
+        if hour_numeric is not None and not 0 <= hour_numeric < 24:
             if not self._add_to_report(340, line_num, table=table,
                                        component='hour',
                                        lower='00', upper='23'):
@@ -779,7 +1005,7 @@ class ExtendedCSV(object):
 
         success = True
 
-        separators = re.findall(r'[^\w\d]', datestamp)
+        separators = _DATETIME_SEPARATOR_RE.findall(datestamp)
         bad_seps = set(separators) - set('-')
 
         for separator in bad_seps:
@@ -805,39 +1031,27 @@ class ExtendedCSV(object):
             raise ValueError('Parsing errors encountered in #{}.Date'
                              .format(table))
 
-        year = month = day = None
-
-        try:
-            year = int(tokens[0])
-        except ValueError:
-            if not self._add_to_report(302, line_num, table=table,
-                                       component='year'):
-                success = False
-        try:
-            month = int(tokens[1])
-        except ValueError:
-            if not self._add_to_report(302, line_num, table=table,
-                                       component='month'):
-                success = False
-        try:
-            day = int(tokens[2])
-        except ValueError:
-            if not self._add_to_report(302, line_num, table=table,
-                                       component='day'):
-                success = False
-
-        present_year = datetime.now().year
-        if year is not None and year not in range(1940, present_year + 1):
+        year, valid = self._int_or_report(
+            302, table, 'year', tokens[0], line_num)
+        success = success and valid
+        month, valid = self._int_or_report(
+            302, table, 'month', tokens[1], line_num)
+        success = success and valid
+        day, valid = self._int_or_report(
+            302, table, 'day', tokens[2], line_num)
+        success = success and valid
+
+        if year is not None and not 1940 <= year <= self._present_year:
             if not self._add_to_report(303, line_num, table=table,
                                        component='year',
                                        lower='1940', upper='PRESENT'):
                 success = False
-        if month is not None and month not in range(1, 12 + 1):
+        if month is not None and not 1 <= month <= 12:
             if not self._add_to_report(303, line_num, table=table,
                                        component='month',
                                        lower='01', upper='12'):
                 success = False
-        if day is not None and day not in range(1, 31 + 1):
+        if day is not None and not 1 <= day <= 31:
             if not self._add_to_report(304, line_num, table=table,
                                        lower='01', upper='31'):
                 success = False
@@ -845,8 +1059,15 @@ class ExtendedCSV(object):
         if not success:
             raise ValueError('Parsing errors encountered in #{}.Date'
                              .format(table))
-        else:
-            return datetime.strptime(datestamp, '%Y-%m-%d').date()
+
+        try:
+            return date(year, month, day)
+        except ValueError:
+            last_day = calendar.monthrange(year, month)[1]
+            self._add_to_report(304, line_num, table=table,
+                                lower='01', upper=str(last_day))
+            raise ValueError('Parsing errors encountered in #{}.Date'
+                             .format(table))
 
     def parse_utcoffset(self, table, utcoffset, line_num):
         """
@@ -864,7 +1085,7 @@ class ExtendedCSV(object):
 
         success = True
 
-        separators = re.findall(r'[^-\+\w\d]', utcoffset)
+        separators = _UTCOFFSET_SEPARATOR_RE.findall(utcoffset)
         bad_seps = set(separators) - set(':')
 
         for separator in bad_seps:
@@ -873,15 +1094,7 @@ class ExtendedCSV(object):
                 success = False
             utcoffset = utcoffset.replace(separator, ':')
 
-        sign = r'(\+|-|\+-)?'
-        delim = r'[^-\+\w\d]'
-        mandatory_place = r'([\d]{1,2})'
-        optional_place = '(' + delim + r'([\d]{0,2}))?'
-
-        template = '^{sign}{mandatory}{optional}{optional}$' \
-                   .format(sign=sign, mandatory=mandatory_place,
-                           optional=optional_place)
-        match = re.findall(template, utcoffset)
+        match = _UTCOFFSET_RE.findall(utcoffset)
 
         if len(match) == 1:
             sign, hour, _, minute, _, second = match[0]
@@ -914,7 +1127,7 @@ class ExtendedCSV(object):
                     success = False
                 second = second.rjust(2, '0')
 
-            if all([hour == '00', minute == '00', second == '00']):
+            if hour == '00' and minute == '00' and second == '00':
                 if sign != '+':
                     if not self._add_to_report(119, line_num, table=table,
                                                sign='+'):
@@ -940,11 +1153,7 @@ class ExtendedCSV(object):
                 self._add_to_report(305, line_num, table=table)
                 raise err
 
-        template = '^{sign}[0]+{delim}?[0]*{delim}?[0]*$' \
-                   .format(sign=sign, delim=delim)
-        match = re.findall(template, utcoffset)
-
-        if len(match) == 1:
+        if _UTCOFFSET_ZERO_RE.match(utcoffset) is not None:
             if not self._add_to_report(120, line_num, table=table):
                 raise ValueError('Parsing errors encountered in #{}.UTCOffset'
                                  .format(table))
@@ -970,9 +1179,9 @@ class ExtendedCSV(object):
         filename = '{}.{}.{}.{}.{}.csv'.format(timestamp, instrument_name,
                                                instrument_model,
                                                instrument_number, agency)
-        if ' ' in filename:
+        file_slug = filename.replace(' ', '-')
+        if file_slug != filename:
             LOGGER.warning('filename contains spaces: {}'.format(filename))
-            file_slug = filename.replace(' ', '-')
             LOGGER.info('filename {} renamed to {}'
                         .format(filename, file_slug))
             filename = file_slug
@@ -995,23 +1204,23 @@ class ExtendedCSV(object):
         """
 
         for table_name in tables:
-            table_type = table_name.rstrip('0123456789_')
+            table_type = self._table_type(table_name)
             body = self.extcsv[table_name]
+            single_row = schema[table_type]['rows'] == 1
 
             table_valueline = self.line_num(table_name) + 2
 
             for field, column in body.items():
                 if field != 'comments':
-                    converted = [
-                        self.typecast_value(table_name, field, val, line)
-                        for line, val in enumerate(column, table_valueline)
-                    ]
-                    if schema[table_type]['rows'] == 1:
-                        if not converted:
-                            converted.append(None)
-                        self.extcsv[table_name][field] = converted[0]
+                    typecast = self._resolve_caster(table_name, field)
+                    if single_row:
+                        body[field] = typecast(column[0], table_valueline) \
+                            if column else None
                     else:
-                        self.extcsv[table_name][field] = converted
+                        body[field] = [
+                            typecast(val, line)
+                            for line, val in enumerate(column, table_valueline)
+                        ]
 
     def check_table_occurrences(self, schema):
         """
@@ -1099,42 +1308,45 @@ class ExtendedCSV(object):
 
         success = True
 
+        body = self.extcsv[table]
         required = definition.get('required_fields', ())
-        optional = definition.get('optional_fields', ())
-        provided = self.extcsv[table].keys()
+        provided = body.keys()
 
-        required_case_map = {key.lower(): key for key in required}
-        optional_case_map = {key.lower(): key for key in optional}
-        provided_case_map = {key.lower(): key for key in provided}
+        required_case_map, optional_case_map = _field_case_maps(definition)
+        provided_lower = {key: key.lower() for key in provided}
+        provided_case_map = {lower: key
+                             for key, lower in provided_lower.items()}
 
         missing_fields = [field for field in required
                           if field not in provided]
         extra_fields = [field for field in provided
-                        if field.lower() not in required_case_map]
+                        if provided_lower[field] not in required_case_map]
 
         fieldline = self.line_num(table) + 1
         valueline = fieldline + 1
 
-        arbitrary_column = next(iter(self.extcsv[table].values()))
+        arbitrary_column = next(iter(body.values()))
         num_rows = len(arbitrary_column)
-        null_value = [''] * num_rows
+
+        # Reports are submitted together once fields are reconciled.
+        reports = []
 
         # Attempt to find a match for all required missing fields.
         for missing in missing_fields:
             match_insensitive = provided_case_map.get(missing.lower(), None)
             if match_insensitive:
-                if not self._add_to_report(105, fieldline, table=table,
-                                           oldfield=match_insensitive,
-                                           newfield=missing):
-                    success = False
-
-                self.extcsv[table][missing] = \
-                    self.extcsv[table].pop(match_insensitive)
+                reports.append((105, fieldline, {
+                    'table': table,
+                    'oldfield': match_insensitive,
+                    'newfield': missing
+                }))
+                body[missing] = body.pop(match_insensitive)
             else:
-                if not self._add_to_report(203, fieldline, table=table,
-                                           field=missing):
-                    success = False
-                self.extcsv[table][missing] = null_value
+                reports.append((203, fieldline, {
+                    'table': table,
+                    'field': missing
+                }))
+                body[missing] = [''] * num_rows
 
         if len(missing_fields) == 0:
             LOGGER.debug('No missing fields in table {}'.format(table))
@@ -1144,33 +1356,42 @@ class ExtendedCSV(object):
         # Assess whether non-required fields are optional fields or
         # excess ones that are not part of the table's schema.
         for extra in extra_fields:
-            match_insensitive = optional_case_map.get(extra.lower(), None)
+            match_insensitive = optional_case_map.get(provided_lower[extra],
+                                                      None)
             if match_insensitive:
                 LOGGER.info('Found optional field #{}.{}'
                             .format(table, extra))
 
                 if extra != match_insensitive:
-                    if not self._add_to_report(105, fieldline, table=table,
-                                               oldfield=extra,
-                                               newfield=match_insensitive):
-                        success = False
-
-                    self.extcsv[table][match_insensitive] = \
-                        self.extcsv[table].pop(extra)
+                    reports.append((105, fieldline, {
+                        'table': table,
+                        'oldfield': extra,
+                        'newfield': match_insensitive
+                    }))
+                    body[match_insensitive] = body.pop(extra)
             elif extra != 'comments':
-                if not self._add_to_report(250, fieldline, table=table,
-                                           field=extra):
-                    success = False
-                del self.extcsv[table][extra]
+                reports.append((250, fieldline, {
+                    'table': table,
+                    'field': extra
+                }))
+                del body[extra]
+
+        if not self._add_to_report_many(reports):
+            success = False
 
         # Check that no required fields have empty values.
         for field in required:
-            column = self.extcsv[table][field]
-            if isinstance(column, list) and '' in column:
+            column = body[field]
+            if not isinstance(column, list):
+                continue
+
+            try:
                 line = valueline + column.index('')
-                if not self._add_to_report(
-                        204, line, table=table, field=field):
-                    success = False
+            except ValueError:  # no empty values
+                continue
+
+            if not self._add_to_report(204, line, table=table, field=field):
+                success = False
         return success
 
     def number_of_observations(self):
@@ -1195,12 +1416,10 @@ class ExtendedCSV(object):
             table_name = self._observations_table + '_' + str(i) \
                 if i > 1 else self._observations_table
 
-            columns = OrderedDict()
-            for i in self.extcsv[table_name]:
-                if i != 'comments':
-                    columns[i] = self.extcsv[table_name][i]
-            rows = zip(*columns.values())
-            data_rows.update(rows)
+            table = self.extcsv[table_name]
+            fields = self._table_fields(table_name)
+            columns = (table[field] for field in fields)
+            data_rows.update(zip(*columns))
         return len(data_rows)
 
     def validate_metadata_tables(self):
@@ -1212,7 +1431,7 @@ class ExtendedCSV(object):
         missing_tables = [table for table in schema
                           if table not in self.extcsv.keys()]
         present_tables = [table for table in self.extcsv.keys()
-                          if table.rstrip('0123456789_') in schema]
+                          if self._table_type(table) in schema]
 
         if len(present_tables) == 0:
             if not self._add_to_report(102):
@@ -1232,11 +1451,11 @@ class ExtendedCSV(object):
             success = False
 
         for table in present_tables:
-            table_type = table.rstrip('0123456789_')
+            table_type = self._table_type(table)
             definition = schema[table_type]
             body = self.extcsv[table]
 
-            arbitrary_column = list(body.items())[1][1]
+            arbitrary_column = next(islice(body.values(), 1, None))
             try:
                 num_rows = len(arbitrary_column)
             except TypeError:
@@ -1248,8 +1467,8 @@ class ExtendedCSV(object):
                 success = False
 
             for field in definition.get('optional_fields', []):
-                if field not in self.extcsv[table]:
-                    self.extcsv[table][field] = [''] * num_rows
+                if field not in body:
+                    body[field] = [''] * num_rows
 
         if success:
             self.collimate_tables(present_tables, schema)
@@ -1269,19 +1488,18 @@ class ExtendedCSV(object):
         tables = DOMAINS['Datasets']
         curr_dict = tables
         fieldline = self.line_num('CONTENT') + 1
-        for field in [('Category', str), ('Level', float), ('Form', int)]:
-            field_name, type_converter = field
+        content = self.extcsv['CONTENT']
+        for field_name, type_converter, qualified_name in _DATASET_KEY_FIELDS:
+            value = content[field_name]
             try:
-                key = str(type_converter(self.extcsv['CONTENT'][field_name]))
+                key = str(type_converter(value))
             except ValueError:
-                key = str(self.extcsv['CONTENT'][field_name])
+                key = str(value)
 
             if key in curr_dict:
                 curr_dict = curr_dict[key]
             else:
-                field_name = '#CONTENT.{}'.format(field_name.capitalize())
-
-                self._add_to_report(220, fieldline, field=field_name)
+                self._add_to_report(220, fieldline, field=qualified_name)
                 return False
 
         if '1' in curr_dict.keys():
@@ -1307,17 +1525,12 @@ class ExtendedCSV(object):
         """
 
         versions = set(schema.keys())
-        tables = {version: schema[version].keys() for version in versions}
+        tables = {version: frozenset(schema[version]) for version in versions}
         uniques = {}
 
         for version in versions:
-            u = set(tables[version])
-            others = versions - {version}
-
-            for other_version in others:
-                u -= set(tables[other_version])
-
-            uniques[version] = u
+            others = (tables[other] for other in versions if other != version)
+            uniques[version] = tables[version].difference(*others)
 
         candidates = {version: [] for version in versions}
         for table in self.extcsv:
@@ -1325,17 +1538,16 @@ class ExtendedCSV(object):
                 if table in uniques[version]:
                     candidates[version].append(table)
 
-        def rating(version):
-            return len(candidates[version]) / len(uniques[version])
+        ratings = {version: len(candidates[version]) / len(uniques[version])
+                   for version in versions}
 
-        candidate_scores = list(map(rating, versions))
-        best_match = max(candidate_scores)
+        best_match = max(ratings.values())
         if best_match == 0:
             self._add_to_report(210)
             raise NonStandardDataError(self.errors)
         else:
-            for version in versions:
-                if rating(version) == best_match:
+            for version, rating in ratings.items():
+                if rating == best_match:
                     return version
 
     def validate_dataset_tables(self):
@@ -1359,10 +1571,10 @@ class ExtendedCSV(object):
         missing_tables = [table for table in required_tables
                           if table not in self.extcsv.keys()]
         present_tables = [table for table in self.extcsv.keys()
-                          if table.rstrip('0123456789_') in schema]
-        required_tables.extend(DOMAINS['Common'].keys())
+                          if self._table_type(table) in schema]
+        known_tables = set(required_tables).union(DOMAINS['Common'])
         extra_tables = [table for table in self.extcsv.keys()
-                        if table.rstrip('0123456789_') not in required_tables]
+                        if self._table_type(table) not in known_tables]
 
         dataset = self.extcsv['CONTENT']['Category']
         for missing in missing_tables:
@@ -1373,11 +1585,11 @@ class ExtendedCSV(object):
             success = False
 
         for table in present_tables:
-            table_type = table.rstrip('0123456789_')
+            table_type = self._table_type(table)
             definition = schema[table_type]
             body = self.extcsv[table]
 
-            arbitrary_column = list(body.items())[1][1]
+            arbitrary_column = next(islice(body.values(), 1, None))
             try:
                 num_rows = len(arbitrary_column)
             except TypeError:
@@ -1390,8 +1602,10 @@ class ExtendedCSV(object):
             LOGGER.debug('Finished validating table {}'.format(table))
 
         for table in extra_tables:
-            table_type = table.rstrip('0123456789_')
-            if table_type not in optional_tables and table_type != 'comments':
+            table_type = self._table_type(table)
+            # Extra tables are not required, so any left in the schema
+            # are optional.
+            if table_type not in schema and table_type != 'comments':
                 if not self._add_to_report(202, table=table, dataset=dataset):
                     success = False
                 del self.extcsv[table]
@@ -1543,7 +1757,7 @@ class Writer(object):
         """
         Initialize a WOUDC Extended CSV writer
 
-        :param ds: OrderedDict of WOUDC tables, fields, values and commons
+        :param ds: dict of WOUDC tables, fields, values and commons
         :param template: boolean to set default / common Extended CSV tables
         :returns: `Writer` object
         """
@@ -1685,6 +1899,25 @@ class Writer(object):
 
         self.ecsv.add_table_comment(table, comment, index)
 
+    def _next_line_num(self, default):
+        """
+        Returns the line number following the last table of the
+        Extended CSV, or <default> if there are no tables yet.
+
+        :param default: line number to use for an empty Extended CSV
+        :returns: line number after the last table
+        """
+
+        line_nums = self.line_num()
+        try:
+            last_table = max(line_nums, key=line_nums.get)
+        except ValueError:
+            return default
+
+        last_body = self.extcsv[last_table]
+        return max(map(len, last_body.values())) + \
+            line_nums[last_table] + len(last_body['comments']) + 2
+
     def add_table(self, table, table_comment=None):
         """
         Add table to extcsv
@@ -1694,14 +1927,7 @@ class Writer(object):
         :param index: table index or grouping
         """
 
-        try:
-            last_table = max(self.line_num(), key=self.line_num().get)
-            line_num = \
-                max(len(v) for v in self.extcsv[last_table].values()) + \
-                self.line_num()[last_table] + \
-                len(self.extcsv[last_table]['comments']) + 2
-        except ValueError:
-            line_num = 0
+        line_num = self._next_line_num(0)
         self.ecsv.init_table(table, [], line_num)
 
         if table_comment is not None:
@@ -1732,10 +1958,7 @@ class Writer(object):
             self.ecsv.add_field_to_table(table, [field], index)
 
         else:  # horizontal insert
-            str_obj = StringIO(field)
-            csv_reader = csv.reader(str_obj, delimiter=delimiter)
-            fields = next(csv_reader)
-            for field in fields:
+            for field in _split_row(field, delimiter):
                 self.ecsv.add_field_to_table(table, [field], index)
 
     def add_data(self, table, data, field=None, index=1, delimiter=',',
@@ -1765,55 +1988,59 @@ class Writer(object):
                 field_l = field.split(delimiter)
             else:
                 field_l = field
-            for f in field_l:  # add field if not present
-                if f not in list(self.extcsv[table_n]):
-                    self.add_field(table, [f], index, delimiter)
+            # add fields not present, in a single batch
+            existing = frozenset(self.extcsv[table_n])
+            new_fields = [f for f in dict.fromkeys(field_l)
+                          if f not in existing]
+            if new_fields:
+                self.add_field(table, new_fields, index, delimiter)
         else:  # field is None: grab all keys from table
-            field_l = list(self.extcsv[table_n].keys())[1:]
+            field_l = list(islice(self.extcsv[table_n], 1, None))
 
         # check data
-        if not isinstance(data, list):
-            str_obj = StringIO(data)
-            csv_reader = csv.reader(str_obj, delimiter=delimiter)
-            data_l = next(csv_reader)
-        else:
+        if isinstance(data, list):
             data_l = data
-        if len(data_l) != len(field_l) and len(field_l) == 1:
-            if len(field_l) == 1:  # vertical insert
-                try:
-                    last_table = max(self.line_num(), key=self.line_num().get)
-                    line_num = \
-                        max(
-                          len(v) for v in self.extcsv[last_table].values()
-                        ) + \
-                        self.line_num()[last_table] + \
-                        len(self.extcsv[last_table]['comments']) + 2
-                except ValueError:
-                    line_num = 2
-                self.ecsv.add_values_to_table(table_n, data_l, line_num,
-                                              fields=field_l, horizontal=False)
-            else:
-                msg = 'fields / values mismatch: {}:{}; skipping' \
-                    .format(field_l, data_l)
-                LOGGER.error(msg)
+        else:
+            data_l = _split_row(data, delimiter)
+        if len(field_l) == 1 and len(data_l) != 1:  # vertical insert
+            line_num = self._next_line_num(2)
+            self.ecsv.add_values_to_table(table_n, data_l, line_num,
+                                          fields=field_l, horizontal=False)
         else:  # horizontal insert
             try:
-                try:
-                    last_table = max(self.line_num(), key=self.line_num().get)
-                    line_num = \
-                        max(
-                          len(v) for v in self.extcsv[last_table].values()
-                        ) + \
-                        self.line_num()[last_table] + \
-                        len(self.extcsv[last_table]['comments']) + 2
-                except ValueError:
-                    line_num = 2
+                table_body = self.extcsv[table_n]
+                if len(data_l) == 1 and len(field_l) == 1 and \
+                        len(table_body) == 2:
+                    # single value into a single-column table: nothing
+                    # to pad, so append directly
+                    table_body[field_l[0]].append(data_l[0].strip())
+                    return
+                line_num = self._next_line_num(2)
                 self.ecsv.add_values_to_table(table_n, data_l, line_num,
                                               fields=field_l)
             except Exception as err:
                 msg = 'unable to add data {}'.format(err)
                 LOGGER.error(msg)
 
+    def add_data_bulk(self, table, field, values, index=1):
+        """
+        Fast path for appending already-split values to a single
+        Extended CSV table field, bypassing the delimiter handling
+        of add_data
+
+        :param table: table name
+        :param field: field name
+        :param values: iterable of values to append
+        :param index: table index or grouping
+        """
+
+        table_n = _table_index(table, index)
+        # add table and field if not present
+        if table_n not in self.extcsv or field not in self.extcsv[table_n]:
+            self.add_field(table, [field], index)
+
+        self.extcsv[table_n][field].extend(map(str, values))
+
     def remove_table(self, table, index=1):
         """
         Remove table from extcsv
@@ -1888,7 +2115,7 @@ class Writer(object):
         """
 
         try:
-            self.clear_field(table, field, index)
+            self.ecsv.clear_field(table, field, index)
         except Exception as err:
             msg = 'could not clear field %s' % err
             LOGGER.error(msg)
@@ -1936,50 +2163,37 @@ class Writer(object):
         csv_writer = csv.writer(mem_file)
 
         if len(self.file_comments) != 0:
-            for comment in self.file_comments:
-                mem_file.write('* %s%s' % (comment, os.linesep))
-            mem_file.write('%s' % os.linesep)
-
-        for table, fields in self.extcsv.items():
-            try:
-                first_num = [t.isdigit() for t in table].index(True)
-                mem_file.write('#%s%s' % (table[0: first_num - 1], os.linesep))
-            except ValueError:
-                mem_file.write('#%s%s' % (table, os.linesep))
+            mem_file.writelines([_COMMENT_TEMPLATE % (comment,)
+                                 for comment in self.file_comments])
+            mem_file.write(_LINE_SEPARATOR)
+
+        last_index = len(self.extcsv) - 1
+        for index, (table, fields) in enumerate(self.extcsv.items()):
+            table_type = _TABLE_INDEX_SUFFIX_RE.sub('', table)
+            mem_file.write(_TABLE_HEADER_TEMPLATE % (table_type,))
             t_comments = fields['comments']
-            row = list(fields.keys())[1:]
-            csv_writer.writerow(row)
+            rows = [list(fields.keys())[1:]]
             values = list(fields.values())[1:]
-            max_len = 1
-            try:
-                if isinstance(values[0], list):
-                    max_len = len(list(max(values, key=len)))
-            except TypeError:
-                max_len = 1
-            for i in range(0, max_len):
-                row = []
-                for value in values:
-                    try:
-                        if isinstance(value, list):
-                            row.append(value[i])
-                        else:
-                            row.append(value)
-                    except IndexError:
-                        row.append('')
-                # clean up row
-                for j in range(len(row) - 1, 0, -1):
-                    if row[j] != '':
-                        break
-                    else:
-                        row.pop(j)
-                csv_writer.writerow(row)
+            max_len = max((len(value) for value in values
+                           if isinstance(value, list)), default=1)
+            # list columns are padded with empty values, scalars repeated
+            columns = [chain(value, repeat('')) if isinstance(value, list)
+                       else repeat(value) for value in values]
+            for row in islice(zip(*columns), max_len):
+                # clean up row: drop trailing empty values
+                end = len(row)
+                while end > 1 and row[end - 1] == '':
+                    end -= 1
+                rows.append(row[:end])
+
+            csv_writer.writerows(rows)
+            trailer = []
             if t_comments is not None and len(t_comments) > 0:
-                for comment in t_comments:
-                    mem_file.write('* %s%s' % (comment, os.linesep))
-            len1 = list(self.extcsv.keys()).index(table)
-            len2 = len(self.extcsv.keys()) - 1
-            if len1 != len2:
-                mem_file.write('%s' % os.linesep)
+                trailer.extend(_COMMENT_TEMPLATE % (comment,)
+                               for comment in t_comments)
+            if index != last_index:
+                trailer.append(_LINE_SEPARATOR)
+            mem_file.writelines(trailer)
 
         self.ecsv._raw = mem_file.getvalue()
         return mem_file
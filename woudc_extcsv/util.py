@@ -45,6 +45,8 @@
 
 import logging
 
+from functools import lru_cache
+
 LOGGER = logging.getLogger(__name__)
 
 
@@ -59,13 +61,12 @@ def non_content_line(line):
 
     if len(line) == 0:
         return True
-    elif len(line) == 1:
-        first = line[0].strip()
-        return len(first) == 0 or first.startswith('*')
-    else:
-        return line[0].strip().startswith('*')
+
+    first = line[0].lstrip()
+    return first.startswith('*') or (len(first) == 0 and len(line) == 1)
 
 
+@lru_cache(maxsize=128)
 def parse_integer_range(bounds_string):
     """
     Returns an integer lower bound and upper bound of the range defined within
@@ -87,13 +88,13 @@ def parse_integer_range(bounds_string):
     return (lower_bound, upper_bound)
 
 
+@lru_cache(maxsize=512)
 def _table_index(table, index):
     """
     Helper function to return table index.
     """
 
-    sep = '_'
     if index > 1:
-        return '{}{}{}'.format(table, sep, str(index))
+        return '{}_{}'.format(table, index)
     else:
         return table